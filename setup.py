@@ -8,6 +8,7 @@ setup(
     install_requires=[
         "numpy",
         "pyDOE3",
+        "scipy",
         "tqdm",
         "jinja2",
         "pyyaml",
@@ -1,9 +1,28 @@
 
+import itertools
+
 import numpy as np
-from pyDOE3 import lhs, fullfact, pbdesign, bbdesign, ccdesign
 
-def generate_samples(n_samples, param_ranges, method='lhs', seed=None):
-    """Generate parameter samples for UQ study."""
+_MAX_LHS_CORRELATION = 0.3   # Largest accepted correlation between two LHS columns
+
+def _max_abs_correlation(unit_samples):
+    """Largest absolute Pearson correlation between two columns of a design."""
+    corr = np.corrcoef(unit_samples, rowvar=False)
+    return np.max(np.abs(corr[np.triu_indices_from(corr, k=1)]))
+
+def generate_samples(n_samples, param_ranges, method='lhs', seed=None, lhs_optimization=None, lhs_iters=100):
+    """
+    Generate parameter samples for UQ study.
+
+    For method='lhs', designs whose columns correlate by more than 0.3 are redrawn
+    (up to lhs_iters times, keeping the least correlated one). lhs_optimization is
+    passed to scipy.stats.qmc.LatinHypercube ('random-cd' or 'lloyd' give more
+    space-filling designs, at a much higher cost for large designs).
+    """
+    # Imported here: scipy.stats alone takes ~0.5 s to import, which every spawned
+    # simulation worker would otherwise pay without ever sampling
+    from scipy.stats import qmc
+    from pyDOE3 import lhs, fullfact, pbdesign, bbdesign, ccdesign
     
     if seed is not None:
         np.random.seed(seed)
@@ -12,13 +31,34 @@ def generate_samples(n_samples, param_ranges, method='lhs', seed=None):
     n_params = len(param_names)
     
     if method == 'lhs':
+        engine = qmc.LatinHypercube(d=n_params, seed=seed, optimization=lhs_optimization)
+        unit_samples = engine.random(n=n_samples)
+        if n_params >= 2 and n_samples >= 4:
+            max_corr = _max_abs_correlation(unit_samples)
+            for _ in range(lhs_iters - 1):
+                if max_corr < _MAX_LHS_CORRELATION:
+                    break
+                candidate = engine.random(n=n_samples)
+                candidate_corr = _max_abs_correlation(candidate)
+                if candidate_corr < max_corr:
+                    unit_samples, max_corr = candidate, candidate_corr
+    elif method == 'lhs_centermaximin':
         unit_samples = lhs(n_params, samples=n_samples, criterion='centermaximin')
     elif method == 'random':
         unit_samples = np.random.random((n_samples, n_params))
-    # elif method == 'grid' or method == 'fullfact':
-    #     n_levels = int(np.ceil(n_samples ** (1/n_params)))
-    #     unit_samples = fullfact([n_levels] * n_params) / (n_levels - 1)
-    #     unit_samples = unit_samples[:n_samples]
+    elif method == 'grid':
+        # Only the first n_samples points of the n_levels**n_params grid are generated
+        # Integer root: the float one rounds up for perfect powers (3125 ** (1/5) > 5)
+        n_levels = max(1, round(n_samples ** (1/n_params)))
+        while n_levels ** n_params < n_samples:
+            n_levels += 1
+        while n_levels > 1 and (n_levels - 1) ** n_params >= n_samples:
+            n_levels -= 1
+        levels = np.linspace(0, 1, n_levels)
+        points = itertools.islice(itertools.product(levels, repeat=n_params), n_samples)
+        unit_samples = np.fromiter(
+            itertools.chain.from_iterable(points), dtype=np.float64, count=n_samples * n_params
+        ).reshape(n_samples, n_params)
     # elif method == 'plackett_burman':
     #     unit_samples = (pbdesign(n_params) + 1) / 2
     #     unit_samples = unit_samples[:n_samples]
@@ -30,11 +70,11 @@ def generate_samples(n_samples, param_ranges, method='lhs', seed=None):
     #     unit_samples = np.clip(unit_samples, 0, 1)
     #     unit_samples = unit_samples[:n_samples]
     else:
-        raise ValueError(f"Unknown sampling method: {method}. Available methods: 'lhs', 'random' ")
+        raise ValueError(f"Unknown sampling method: {method}. Available methods: 'lhs', 'lhs_centermaximin', 'random', 'grid' ")
     
-    samples = np.zeros_like(unit_samples)
-    for i, param_name in enumerate(param_names):
-        min_val, max_val = param_ranges[param_name]
-        samples[:, i] = min_val + unit_samples[:, i] * (max_val - min_val)
+    bounds = np.array([param_ranges[name] for name in param_names], dtype=np.float64)
+    mins = bounds[:, 0]
+    spans = bounds[:, 1] - bounds[:, 0]
+    samples = mins + unit_samples * spans
     
     return samples
\ No newline at end of file
@@ -4,18 +4,38 @@ UQ Runner for OpenFOAM Studies
 Main orchestration logic for uncertainty quantification studies.
 """
 import os
+import atexit
+import hashlib
+import pickle
+import signal
+import sys
 from pathlib import Path
+import shutil
 import subprocess
 from tqdm import tqdm
 import multiprocessing as mp
-from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from functools import lru_cache, wraps
+from collections import defaultdict
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, StrictUndefined
 
 from ..utils import load_config
 from .sampling import generate_samples
 
 _DESTINATION_FOLDER = Path('experiments/temp')   # Default destination folder for experiments
+_DONE_MARKER = '.uq_done'   # Written in a case once its simulation completed
+_WORKER_CONFIG = None   # Experiment configuration of a pool worker, set by _init_worker
+_WORKER_MANIFEST = None # Template files of a pool worker, set by _init_worker
+_EXECUTOR = None        # Worker pool kept alive between studies with the same setup
+_EXECUTOR_KEY = None
+_ALLOWED_PARAMS = frozenset({
+    'input_path', 'output_path',
+    'parameter_ranges', 'nthreads', 'solver', 'link_files', 'chunksize', 'runtime_key', 'force',
+    'theModel' # parameter from uqpylab, it is not used here
+})
 
 def uq_simulation(X, Params):
     """
@@ -36,18 +56,19 @@ def uq_simulation(X, Params):
             'parameter_ranges': Dictionary defining the ranges for each parameter
             'nthreads': Number of threads to be used in the simulation (default: 1)
             'solver': Name of the script-solver to be used. The same as defined in the OpenFOAM template case
+            'link_files': Hard-link the template files into each sample instead of copying them (default: False)
+            'chunksize': Number of samples sent to a worker at once (default: n_samples // (4 * nthreads)).
+                Use 1 when solver runtimes vary a lot between samples, for the best load balance
+            'runtime_key': Parameter whose larger values lead to longer simulations (optional).
+                Samples are dispatched in decreasing order of it, so the longest runs start first
+            'force': Rerun samples that already completed with the same parameters (default: False)
     """
 
 
     ##############################################################################################################
     ## Input parameters validation ###############################################################################
-    for k in Params.keys():
-        if k not in [
-            'input_path', 'output_path',
-            'parameter_ranges', 'nthreads', 'solver',
-            'theModel' # parameter from uqpylab, it is not used here
-        ]:
-            raise Exception(f"Unknown key '{k}' in Params")
+    if unknown := Params.keys() - _ALLOWED_PARAMS:
+        raise Exception(f"Unknown keys {sorted(unknown)} in Params")
 
     input_path = Params.get('input_path', None)
     output_path = Params.get('output_path', _DESTINATION_FOLDER)
@@ -66,49 +87,261 @@ def uq_simulation(X, Params):
 
 
     nthreads = Params['nthreads'] if 'nthreads' in Params else 1
+    chunksize = _dispatch_chunksize(Params, keys, len(X), nthreads)
     exp_name = Path(output_path).name
     ##############################################################################################################
 
     
     ##############################################################################################################
     ## Sample generation #########################################################################################
-    process_func = partial(
-        _process_random_sim,
-        exp_config=Params
-    )
+    order = _dispatch_order(X, keys, Params.get('runtime_key', None))
+    _run_samples(X, order, Params, nthreads, chunksize)
+    ##############################################################################################################
+
+    print(f"UQ study completed. Results saved in '{output_path}' folder")
+
+
+def _dispatch_chunksize(config, keys, n_samples, nthreads):
+    """
+    Validates the 'chunksize' and 'runtime_key' settings of a study and returns its
+    chunksize (default: n_samples // (4 * nthreads), at least 1).
+    """
+    if config.get('runtime_key', None) not in [None, *keys]:
+        raise ValueError("The 'runtime_key' must be one of the keys in 'parameter_ranges'")
+
+    chunksize = config.get('chunksize', max(1, n_samples // (nthreads * 4)))
+    if isinstance(chunksize, bool) or not isinstance(chunksize, (int, np.integer)) or chunksize < 1:
+        raise ValueError("The 'chunksize' must be a positive integer")
+    return chunksize
+
+
+def _dispatch_order(X, keys, runtime_key):
+    """
+    Returns the sample indices in dispatch order. With a runtime_key, the longest
+    simulations are dispatched first so they do not end up as stragglers at the end
+    of the study. The sample index is kept, so the output folders are not affected.
+    """
+    if runtime_key is None:
+        return list(range(len(X)))
+    runtimes = np.asarray(X)[:, keys.index(runtime_key)].astype(np.float64)   # X may hold categorical columns
+    return np.argsort(-runtimes, kind='stable').tolist()
+
+
+def _template_signature(base_dir):
+    """
+    Returns (path, size, mtime, link) of every directory, file and symlink in the
+    template case, with paths relative to base_dir and directories listed before their
+    contents. Directories have size and mtime set to None, symlinks too, with link set
+    to their target (None otherwise). Used to detect edits and as the manifest of _sync_case.
+    """
+    signature = []
+    for root, dirs, files in os.walk(base_dir):
+        rel_root = os.path.relpath(root, base_dir)
+        signature.append((rel_root, None, None, None))
+
+        # Symlinks are kept as links, like 'rsync -a' (os.walk does not follow them)
+        for name in sorted(dirs + files):
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                signature.append((os.path.join(rel_root, name), None, None, os.readlink(path)))
+        dirs[:] = sorted(name for name in dirs if not os.path.islink(os.path.join(root, name)))
+
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                st = os.stat(path)
+                signature.append((os.path.join(rel_root, name), st.st_size, st.st_mtime_ns, None))
+    return tuple(signature)
+
+
+def _shutdown_executor(cancel=False):
+    """
+    Shuts the worker pool down. With cancel (an interrupted or failed study), queued
+    chunks are dropped and the workers are terminated like Pool.terminate(), stopping
+    the solvers they are running; shutdown() alone would let them run to completion.
+    """
+    global _EXECUTOR, _EXECUTOR_KEY
+    if _EXECUTOR is not None:
+        if cancel:
+            processes = list((getattr(_EXECUTOR, '_processes', None) or {}).values())
+            for process in processes:
+                process.terminate()
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.join()
+        else:
+            _EXECUTOR.shutdown()
+    _EXECUTOR = _EXECUTOR_KEY = None
+
+atexit.register(_shutdown_executor)
+
+
+def _get_executor(nthreads, exp_config):
+    """
+    Returns the worker pool for a study. The previous pool is reused when the number of
+    workers, the working directory (relative paths are resolved by the workers), the
+    configuration and the template files are unchanged, so repeated studies
+    do not pay the worker start-up (spawn and imports) again. Otherwise a new pool is
+    started, with the configuration and the template manifest sent once per worker
+    through _init_worker.
+    """
+    global _EXECUTOR, _EXECUTOR_KEY
+    manifest = _template_signature(exp_config['input_path'])
+    key = (nthreads, os.getcwd(), pickle.dumps(exp_config), manifest)
+    if _EXECUTOR is None or key != _EXECUTOR_KEY:
+        _shutdown_executor()
+        _EXECUTOR = ProcessPoolExecutor(
+            max_workers=nthreads,
+            mp_context=mp.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(exp_config, manifest)
+        )
+        _EXECUTOR_KEY = key
+    return _EXECUTOR
+
 
-    iparams = list(enumerate([ dict(zip(keys, x)) for x in X ]))
-    with mp.get_context('spawn').Pool(nthreads) as pool:
-        for _ in tqdm(
-            pool.imap_unordered(process_func, iparams),
-            total=len(iparams), 
+def _run_samples(X, order, exp_config, nthreads, chunksize):
+    """
+    Runs the simulations of all samples (rows of X) on the worker pool, dispatching
+    the sample indices in chunks and reporting progress as chunks complete.
+
+    A numeric X is placed once in shared memory, so a task only carries sample indices;
+    workers read the rows and pair them with the 'parameter_ranges' keys. Designs with
+    non-numeric columns (e.g. turbulence model names) are sent row by row instead.
+    """
+    rows = None
+    X_array = np.asarray(X)
+    if X_array.dtype.hasobject:
+        try:
+            X_array = X_array.astype(np.float64)
+        except (TypeError, ValueError):
+            pass
+    if X_array.dtype.kind not in 'biuf':
+        rows = X.tolist() if isinstance(X, np.ndarray) else [list(x) for x in X]
+    X = X_array
+
+    # Compile the templates once here: workers load the compiled code from the bytecode cache
+    keys = list(exp_config['parameter_ranges'].keys())
+    env = _jinja_env(str(exp_config['input_path']))
+    for template_path in _group_params_by_template(dict.fromkeys(keys)):
+        env.get_template(template_path)
+
+    shm = None
+    try:
+        if rows is None:
+            shm = SharedMemory(create=True, size=max(X.nbytes, 1))
+            np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+        executor = _get_executor(nthreads, exp_config)
+        chunks = [order[i:i + chunksize] for i in range(0, len(order), chunksize)]
+        with tqdm(
+            total=len(order),
             desc='Running simulations',
             mininterval=1.0     # Updates at most once per second
-        ):
-            pass
-    ##############################################################################################################
+        ) as pbar:
+            futures = {
+                (
+                    executor.submit(_process_chunk, shm.name, X.shape, X.dtype.str, chunk) if rows is None
+                    else executor.submit(_process_rows, [(i, rows[i]) for i in chunk])
+                ): len(chunk)
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                future.result()
+                pbar.update(futures[future])
+    except BaseException:
+        # Interrupted (e.g. KeyboardInterrupt) or failed: terminate the pool so no
+        # chunk keeps running after the study is gone
+        _shutdown_executor(cancel=True)
+        raise
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+
+def _exit_on_terminate(func):
+    """
+    Wraps a pool task so the worker exits on the SystemExit raised by _exit_worker;
+    ProcessPoolExecutor would otherwise catch it and start the next chunk.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except SystemExit as e:
+            sys.stdout.flush()
+            os._exit(e.code if isinstance(e.code, int) else 1)
+    return wrapper
+
+
+@_exit_on_terminate
+def _process_chunk(shm_name, shape, dtype, indices):
+    """
+    Processes a chunk of simulations in a pool worker, reading the sampled
+    parameters from the shared experimental design.
+    """
+    try:
+        shm = SharedMemory(name=shm_name)
+    except FileNotFoundError:   # the study was interrupted and its design released
+        return
+    try:
+        X = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        rows = [X[i].tolist() for i in indices]
+        del X   # release the buffer before closing the segment
+    finally:
+        shm.close()
 
-    print(f"UQ study completed. Results saved in '{output_path}' folder")
+    _process_rows(zip(indices, rows))
+
+
+@_exit_on_terminate
+def _process_rows(rows):
+    """
+    Processes (sample index, row of X) pairs of simulations in a pool worker.
+    """
+    keys = list(_WORKER_CONFIG['parameter_ranges'].keys())
+    for i, row in rows:
+        _process_random_sim((i, dict(zip(keys, row))))
 
 
-def _process_random_sim(param_data, exp_config, verbose=False):
+def _init_worker(exp_config, manifest):
+    """
+    Pool initializer storing the experiment configuration and the template manifest
+    (see _template_signature) in the worker process.
+    """
+    global _WORKER_CONFIG, _WORKER_MANIFEST
+    _WORKER_CONFIG = exp_config
+    _WORKER_MANIFEST = manifest
+    # Exit through an exception on terminate(), so a running solver is killed first
+    signal.signal(signal.SIGTERM, _exit_worker)
+
+
+def _exit_worker(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _process_random_sim(param_data, exp_config=None, verbose=False):
     """
     Process a single simulation (helper function for randomized multiprocessing).
     
     Parameters:
         param_data ((index, parameters_dict)): Tuple containing the sample index and parameters dictionary.
-        exp_config (dict): Solver configuration
+        exp_config (dict): Solver configuration (default: the one set by _init_worker)
     """
     i, params = param_data
+    if exp_config is None:
+        exp_config = _WORKER_CONFIG
     exp_path = Path(exp_config.get('output_path', _DESTINATION_FOLDER))
     experiment_name = exp_path / f"sample_{i:03d}"
-    exp_config['output_path'] = str(experiment_name)
+    # Copy instead of mutating: tasks in the same chunk share one exp_config
+    exp_config = {**exp_config, 'output_path': str(experiment_name)}
 
     try:
         run_simulation(
             params=params,
             exp_config=exp_config,
-            verbose=verbose
+            verbose=verbose,
+            force=exp_config.get('force', False)
         )
     except Exception as e:
         print(f"Error in sample {i}: {e}")
@@ -136,27 +369,13 @@ def run_uq_study(config_file, n_samples, verbose=False):
     )
     if X.ndim == 1:
         X = X.reshape(-1, 1)
-    X = X.tolist()
 
     nthreads = config['nthreads'] if 'nthreads' in config else 1
-    keys = config['parameter_ranges'].keys()
-    if keys is None:
-        raise Exception("The parameter 'parameter_ranges' must be provided in the config file")
+    keys = list(config['parameter_ranges'].keys())
+    chunksize = _dispatch_chunksize(config, keys, len(X), nthreads)
 
-    process_func = partial(
-        _process_random_sim,
-        exp_config=config
-    )
-
-    iparams = list(enumerate([ dict(zip(keys, x)) for x in X ]))
-    with mp.get_context('spawn').Pool(nthreads) as pool:
-        for _ in tqdm(
-            pool.imap_unordered(process_func, iparams),
-            total=len(iparams), 
-            desc='Running simulations',
-            mininterval=1.0     # Updates at most once per second
-        ):
-            pass
+    order = _dispatch_order(X, keys, config.get('runtime_key', None))
+    _run_samples(X, order, config, nthreads, chunksize)
 
     if verbose:
         print(f"UQ study completed. Results saved in '{output_path}' folder")
@@ -164,13 +383,239 @@ def run_uq_study(config_file, n_samples, verbose=False):
 
 
 
-def run_simulation(params, exp_config, verbose=False):
+@lru_cache(maxsize=8)
+def _jinja_env(base_dir, auto_reload=True):
+    """
+    Returns the Jinja environment for a template case, created once per process.
+    Compiled templates are also shared across processes through the bytecode cache.
+    Without auto_reload, loaded templates are never checked again for changes on disk.
+    """
+    return Environment(
+        loader=FileSystemLoader(base_dir),
+        bytecode_cache=FileSystemBytecodeCache(),
+        auto_reload=auto_reload,
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+
+
+def _sync_case(base_dir, output_path, copy_function, manifest=None):
+    """
+    Mirrors base_dir into output_path like 'rsync -a --delete'. Files whose size and
+    modification time already match are kept (copies preserve the source mtime), so
+    rerunning a sample only copies what changed. Anything not in base_dir, such as
+    results of a previous run, is removed.
+
+    Parameters:
+        manifest (tuple, optional): Listing of base_dir from _template_signature.
+            Pool workers receive it once, so the template is not walked per sample.
+
+    Returns:
+        int: Number of files copied.
+    """
+    base_dir, output_path = Path(base_dir), Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    if manifest is None:
+        manifest = _template_signature(base_dir)
+
+    # Without hard links, a file still linked to the template (left by an earlier run
+    # with link_files) is copied again, so the solver cannot modify the template
+    link_files = copy_function is _link_or_copy
+
+    n_copied = 0
+    expected = set()
+    for rel_path, size, mtime, link in manifest:
+        dst = output_path / rel_path
+        expected.add(Path(rel_path))
+
+        if link is not None:
+            if dst.is_symlink() and os.readlink(dst) == link:
+                continue
+            _remove_path(dst)
+            os.symlink(link, dst)
+            continue
+
+        if size is None:    # directory
+            if dst.is_symlink() or dst.is_file():
+                dst.unlink()
+            dst.mkdir(exist_ok=True)
+            continue
+
+        try:
+            dst_stat = dst.lstat()
+            if (dst_stat.st_size == size and dst_stat.st_mtime_ns == mtime and not dst.is_symlink()
+                    and (link_files or dst_stat.st_nlink == 1)):
+                continue
+            _remove_path(dst)
+        except FileNotFoundError:
+            pass
+        copy_function(base_dir / rel_path, dst)
+        n_copied += 1
+
+    for root, dirs, files in os.walk(output_path, topdown=False):
+        rel_root = Path(root).relative_to(output_path)
+        for name in files:
+            if rel_root / name not in expected:
+                (Path(root) / name).unlink()
+        for name in dirs:
+            if rel_root / name not in expected:
+                extra = Path(root) / name
+                if extra.is_symlink():
+                    extra.unlink()
+                else:
+                    extra.rmdir()   # already emptied, children are visited first
+
+    return n_copied
+
+
+def _remove_path(path):
+    """
+    Removes a file, symlink or directory tree, if it exists.
+    """
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _clone_or_copy(src, dst):
+    """
+    Copies src to dst with os.copy_file_range, which lets the kernel share the data
+    blocks (reflink) on copy-on-write filesystems such as btrfs or XFS, falling back
+    to shutil.copy2 where it is not supported.
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        raise OSError("copy_file_range stopped before the end of the file")
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass
+    return shutil.copy2(src, dst)
+
+
+def _group_params_by_template(params):
+    """
+    Groups 'folder__filename__paramname' parameters by template file.
+
+    Returns:
+        dict: {template_path: {paramname: value}}
+    """
+    paths_n_vars = defaultdict(dict)
+    for param_path, value in params.items():
+        path_parts = param_path.split('__')
+        if len(path_parts) < 2:
+            raise ValueError(f"Parameter key '{param_path}' is not in the correct format. Use 'folder__filename__paramname' format.")
+        param = path_parts[-1]
+
+        template_path = str(Path(*path_parts[:-1]))
+        paths_n_vars[template_path][param] = value
+    return paths_n_vars
+
+
+@lru_cache(maxsize=256)
+def _render_cached(base_dir, template_path, frozen_params):
+    return _jinja_env(base_dir, auto_reload=False).get_template(template_path).render(dict(frozen_params))
+
+
+def _render_template(env, base_dir, template_path, params_dict):
+    """
+    Renders a template with its parameters. Without auto_reload (pool workers), rendered
+    outputs are memoized, so samples repeating the values of a file's parameters
+    (e.g. grid designs) reuse the rendered text.
+    """
+    if not env.auto_reload:
+        try:
+            return _render_cached(base_dir, template_path, tuple(sorted(params_dict.items())))
+        except TypeError:   # unhashable values (e.g. lists) are rendered directly
+            pass
+    return env.get_template(template_path).render(params_dict)
+
+
+def _render_one(env, base_dir, output_path, template_path, params_dict):
+    """
+    Renders one template file of a sample and writes it to the sample case.
+    """
+    output = _render_template(env, str(base_dir), template_path, params_dict)
+
+    target_path = output_path / template_path
+    target_path.parent.mkdir(parents=True, exist_ok=True)  # ensure dirs exist
+    target_path.unlink(missing_ok=True)     # break a hard link so the template stays untouched
+    target_path.write_text(output)
+
+
+def _link_or_copy(src, dst):
+    """
+    Hard-links src to dst, falling back to a copy when linking is not possible
+    (e.g. across filesystems).
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _hash_value(digest, value):
+    """
+    Feeds a parameter value to a hash. Arrays, lists and floats are hashed by their
+    binary content, since their repr may be abbreviated (numpy elides the middle of
+    large arrays) or depend on print options.
+    """
+    if isinstance(value, (float, np.floating)):
+        value = np.float64(value)
+    if isinstance(value, (np.ndarray, np.generic, list, tuple)):
+        arr = np.asarray(value)
+        if not arr.dtype.hasobject:
+            digest.update(repr((arr.dtype.str, arr.shape)).encode())
+            digest.update(np.ascontiguousarray(arr).tobytes())
+            return
+        if arr.ndim > 0:    # mixed types: hash element by element
+            digest.update(repr(('object', arr.shape)).encode())
+            for item in arr.flat:
+                _hash_value(digest, item)
+            return
+    digest.update(repr(value).encode())
+
+
+def _run_fingerprint(params, manifest, solver_script):
+    """
+    Returns a digest identifying a simulation: its parameters, solver script and
+    template files (path, size, mtime, as listed in the manifest).
+    """
+    digest = hashlib.sha256()
+    for key in sorted(params):
+        digest.update(repr(key).encode())
+        _hash_value(digest, params[key])
+    digest.update(repr((solver_script, manifest)).encode())
+    return digest.hexdigest()
+
+
+def run_simulation(params, exp_config, verbose=False, force=False):
     """
     Runs an OpenFOAM simulation with the given parameters.
 
+    The template case is copied to the output path, replacing any previous content
+    (as reflinks on copy-on-write filesystems).
+    With exp_config['link_files'] set, files are hard-linked instead of copied;
+    rendered templates are always written as new files, but the solver script
+    must not modify any other template file in place (e.g. by rerunning blockMesh
+    over a linked constant/polyMesh).
+    The solver output (stdout and stderr) is written to 'log.solver' in the case.
+
+    A successful run leaves a '.uq_done' marker. Running the same parameters, solver
+    and template files again over that case returns immediately, unless force is set.
+
     Parameters:
         params (dict): Dictionary containing the parameters for the simulation.
         exp_config (dict): Configuration dictionary containing experiment details.
+        force (bool): Rerun the simulation even if it already completed.
     """
     if not isinstance(params, dict):
         raise ValueError("params must be a dictionary")
@@ -198,55 +643,50 @@ def run_simulation(params, exp_config, verbose=False):
             print(f"Created parent directory: {parent_folder}")
 
 
+    # Pool workers are replaced whenever the template files change, so their manifest is current
+    manifest = _WORKER_MANIFEST if _WORKER_MANIFEST is not None else _template_signature(base_dir)
+
+    done_marker = output_path / _DONE_MARKER
+    fingerprint = _run_fingerprint(params, manifest, solver_script)
+    if not force and done_marker.exists() and done_marker.read_text() == fingerprint:
+        if verbose:
+            print(f" -- {output_path} already completed with these parameters. Skipping. --")
+        return
+
     try:
-        if not output_path.exists():
-            output_path.mkdir(parents=True)
-        else:
+        if output_path.exists():
             if verbose:
                 print(" -- The directory already exists. Files will be overwritten. --")
-            
-        result = subprocess.run(
-            ["rsync", "-av", "--delete", f'{str(base_dir)}/', f'{str(output_path)}/'],
-            check=True,
-            capture_output=True,
-            text=True
+
+        n_copied = _sync_case(
+            base_dir, output_path,
+            copy_function=_link_or_copy if exp_config.get('link_files', False) else _clone_or_copy,
+            manifest=manifest
         )
         if verbose:
-            print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("Error copying the files:", e.stderr)
+            print(f"Synchronized {output_path} with {base_dir} ({n_copied} files copied)")
+    except OSError as e:
+        raise RuntimeError("Error copying the files:", e)
 
-    env = Environment(
-        loader=FileSystemLoader(base_dir),
-        trim_blocks=True,
-        lstrip_blocks=True
-    )
+    # Pool workers are replaced whenever the template files change, so they can skip the
+    # template freshness checks; direct calls (e.g. from a notebook) still pick up edits
+    env = _jinja_env(str(base_dir), auto_reload=_WORKER_CONFIG is None)
 
     # ======================================================================
     # REORGANIZING RENDERIZATION STRATEGY
     # Create a new dict with template paths with their respective params
-    paths_n_vars = {}
-    for param_path, value in params.items():
-        path_parts = param_path.split('__')
-        if len(path_parts) < 2:
-            if len(path_parts) < 2:
-                raise ValueError(f"Parameter key '{param_path}' is not in the correct format. Use 'folder__filename__paramname' format.")
-        param = path_parts[-1]
-
-        template_path = str(Path(*path_parts[:-1]))
-
-        if template_path not in paths_n_vars:
-            paths_n_vars[template_path] = {}
-        paths_n_vars[template_path][param] = value
-
-    # For each template path render all its params at once
-    for template_path, params_dict in paths_n_vars.items():
-        template = env.get_template(str(template_path))
-        output = template.render(params_dict, undefined=StrictUndefined)
-
-        target_path = output_path / template_path
-        target_path.parent.mkdir(parents=True, exist_ok=True)  # ensure dirs exist
-        target_path.write_text(output)
+    paths_n_vars = _group_params_by_template(params)
+
+    # For each template path render all its params at once, overlapping the file writes
+    if len(paths_n_vars) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(paths_n_vars))) as executor:
+            list(executor.map(
+                lambda item: _render_one(env, base_dir, output_path, *item),
+                paths_n_vars.items()
+            ))
+    else:
+        for template_path, params_dict in paths_n_vars.items():
+            _render_one(env, base_dir, output_path, template_path, params_dict)
     # ======================================================================
 
     try:
@@ -254,17 +694,29 @@ def run_simulation(params, exp_config, verbose=False):
         if not solver_path.exists():
             raise FileNotFoundError(f"Solver script not found: {solver_path}")
 
-        result = subprocess.run(
-            [f"./{solver_script}"],
-            cwd=str(output_path),
-            check=True,
-            capture_output=True,
-            text=True
-        )
+        # The solver output goes straight to a log file in the case, never through memory
+        log_path = output_path / 'log.solver'
+        with open(log_path, 'wb') as log:
+            # Own process group, so an interrupted run also stops the applications the
+            # solver script started (e.g. runApplication in an Allrun)
+            process = subprocess.Popen(
+                [f"./{solver_script}"],
+                cwd=str(output_path),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+            try:
+                returncode = process.wait()
+            except BaseException:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+                raise
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, process.args)
         if verbose:
-            print(result.stdout)
+            print(log_path.read_text(errors='replace'))
+        done_marker.write_text(fingerprint)
 
     except subprocess.CalledProcessError as e:
-        print(f"Solver failed with code {e.returncode}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
\ No newline at end of file
+        print(f"Solver failed with code {e.returncode}. See the solver output in '{log_path}'")
\ No newline at end of file
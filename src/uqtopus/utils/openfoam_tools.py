@@ -1,5 +1,9 @@
+import os
+import re
+import mmap
 from pathlib import Path
-from functools import partial
+from functools import partial, lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import multiprocessing as mp
 from tqdm import tqdm
 
@@ -7,79 +11,159 @@ import numpy as np
 import xarray as xr
 import yaml
 import json
-from fluidfoam import readmesh, readfield, readvector, readscalar, typefield
+from fluidfoam import readmesh, readfield
 
 
-def parse_openfoam_case(case_dir:str, variables:list[str], time_dirs:list[str]|str=None):
+def _mesh_stamp(case_dir:str):
     """
-    Parses the OpenFOAM case directory structure and reads all field data.
-    
+    Returns (name, size, mtime) of the files in constant/polyMesh, so a mesh
+    regenerated in place (e.g. a study rerun into the same output path) is read again.
+    """
+    try:
+        with os.scandir(os.path.join(case_dir, 'constant', 'polyMesh')) as entries:
+            return tuple(sorted(
+                (e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in entries if e.is_file()
+            ))
+    except FileNotFoundError:
+        return ()
+
+
+@lru_cache(maxsize=32)
+def _readmesh_stamped(case_dir:str, stamp:tuple):
+    mesh = readmesh(case_dir, verbose=False)
+    for coord in mesh:
+        coord.setflags(write=False)
+    return mesh
+
+
+def _cached_readmesh(case_dir:str):
+    """
+    Reads the cell centres of an OpenFOAM case, cached per case directory and
+    mesh files. The arrays are shared between calls, so they are made read-only.
+    """
+    return _readmesh_stamped(case_dir, _mesh_stamp(case_dir))
+
+
+def _read_case_field(case_dir:str, time_dir:str, field_file:str, n_cells:int, dtype=np.float64):
+    """
+    Reads a single field of an OpenFOAM case (helper function for threaded reading).
+
+    Uniform fields (single value in file) are expanded to the mesh as zero-copy
+    broadcast views; the time stacking in parse_openfoam_case does the only copy.
+
+    Returns:
+        np.ndarray: Field data with cells along the first axis, or None on failure.
+    """
+    try:
+        field = readfield(case_dir, time_dir, field_file, verbose=False).T.astype(dtype, copy=False)
+    except Exception as e:
+        print(f"Error reading {field_file} in {time_dir}: {e}")
+        return None
+
+    if field.ndim == 1 and field.shape[0] == 1:     # scalar uniform field
+        field = np.broadcast_to(field, (n_cells,))
+    elif field.ndim == 2 and (field.shape[0] == 1 or field.shape[1] == 1):   # vector uniform field
+        field = np.broadcast_to(field[0], (n_cells,) + field[0].shape)
+    return field
+
+
+def _field_dims(ndim:int):
+    """
+    Returns the dimension names of a field array with a leading time axis.
+    """
+    if ndim == 2: # (time, cell) or (time, cell, component)
+        return ['time', 'cell']
+    elif ndim == 3:
+        return ['time', 'cell', 'component']
+    else: # higher dimensions
+        return ['time'] + [f'dim_{i}' for i in range(1, ndim)]
+
+
+def _read_case_arrays(case_dir:str, n_cells:int, variables:list[str], time_dirs:list[str]|str=None, nthreads:int=None, dtype=np.float64):
+    """
+    Reads all field data of an OpenFOAM case as plain NumPy arrays.
+    The mesh is not read here, only its number of cells is needed.
+
     Parameters:
-        case_dir (str): Path to the root directory of the OpenFOAM case.
-        variables (list): List of field names to read.
-        time_dirs (list or str, optional): List of time directories to read.
-        
+        n_cells (int): Number of mesh cells, used to expand uniform fields.
+        Others: Same as parse_openfoam_case.
+
     Returns:
-        xr.Dataset: Dataset with variables as data variables and time as coordinate.
+        tuple: (times, arrays), where arrays maps each variable to its
+            stacked (time, cell, ...) array.
     """
 
     if time_dirs is None:
-        time_dirs = sorted(
-            [p.name for p in Path(case_dir).iterdir() if p.is_dir() and p.stem.isdigit()],
-            key=lambda x: float(x)
-        )
+        # Time directories are named by their (possibly fractional) time value
+        with os.scandir(case_dir) as entries:
+            time_dirs = sorted(
+                (e.name for e in entries if e.name.replace('.', '', 1).isdigit() and e.is_dir()),
+                key=float
+            )
     else:
         if isinstance(time_dirs, str):
             time_dirs = [time_dirs]
 
     time_dirs = [str(t) for t in time_dirs]
-
-    # Store all data
-    data_vars = {}
     times = [float(t) for t in time_dirs]
-    
-    # Read all data first
-    all_data = {}
-    for time_dir in time_dirs:
-        all_data[time_dir] = {}
-        
-        for field_file in variables:
-            try:
-                all_data[time_dir][field_file] = readfield(case_dir, time_dir, field_file, verbose=False).T
-            except Exception as e:
-                print(f"Error reading {field_file} in {time_dir}: {e}")
-    
-    
-    x, y, z = readmesh(case_dir, verbose=False)
 
-    # Handling uniform fields (single value in file)
-    max_elements = len(x)
-    for time_data in all_data.values():
-        for fname, field in time_data.items():
-            if field.ndim == 1 and field.shape[0] == 1:     # scalar uniform field
-                time_data[fname] = np.stack([field] * max_elements, axis=0).flatten()
-            elif field.ndim == 2 and (field.shape[0] == 1 or field.shape[1] == 1):   # vector uniform field
-                time_data[fname] = np.stack([field[0]] * max_elements, axis=0).reshape(max_elements, -1)
+    # Read all (time, field) pairs concurrently; the work is dominated by file I/O
+    tasks = [(time_dir, field_file) for time_dir in time_dirs for field_file in variables]
+    if nthreads is None:
+        nthreads = min(32, len(tasks)) or 1
 
-    # Create xarray data variables
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        fields = list(executor.map(
+            lambda task: _read_case_field(case_dir, *task, n_cells=n_cells, dtype=dtype),
+            tasks
+        ))
+
+    all_data = {time_dir: {} for time_dir in time_dirs}
+    for (time_dir, field_file), field in zip(tasks, fields):
+        if field is not None:
+            if field.shape[0] != n_cells:
+                raise ValueError(
+                    f"{field_file} in {os.path.join(case_dir, time_dir)} has {field.shape[0]} cells, "
+                    f"expected {n_cells} (the samples of a study must share the same mesh)"
+                )
+            all_data[time_dir][field_file] = field
+
+    # Stack time data for each variable
+    arrays = {}
     for var in variables:
-        # Stack time data for this variable
         var_data = []
         for time_dir in time_dirs:
             var_data.append(all_data[time_dir][var])
         
         if var_data:
-            var_array = np.stack(var_data, axis=0)
-            
-            # Create appropriate dimensions based on shape
-            if var_array.ndim == 2: # (time, cell) or (time, cell, component)
-                dims = ['time', 'cell']
-            elif var_array.ndim == 3:
-                dims = ['time', 'cell', 'component']
-            else: # higher dimensions
-                dims = ['time'] + [f'dim_{i}' for i in range(1, var_array.ndim)]
-            
-            data_vars[var] = xr.DataArray(var_array, dims=dims)
+            arrays[var] = np.stack(var_data, axis=0)
+
+    return times, arrays
+
+
+def parse_openfoam_case(case_dir:str, variables:list[str], time_dirs:list[str]|str=None, nthreads:int=None, dtype=np.float64):
+    """
+    Parses the OpenFOAM case directory structure and reads all field data.
+    
+    Parameters:
+        case_dir (str): Path to the root directory of the OpenFOAM case.
+        variables (list): List of field names to read.
+        time_dirs (list or str, optional): List of time directories to read.
+        nthreads (int, optional): Number of threads reading fields (default: one per time/field pair, up to 32).
+        dtype (np.dtype, optional): Floating point type of the field data (default: np.float64).
+            np.float32 halves the memory and matches the precision of default ASCII output.
+        
+    Returns:
+        xr.Dataset: Dataset with variables as data variables and time as coordinate.
+    """
+
+    x, y, z = _cached_readmesh(str(case_dir))
+    times, arrays = _read_case_arrays(case_dir, len(x), variables, time_dirs, nthreads, dtype)
+
+    # Create xarray data variables
+    data_vars = {}
+    for var, var_array in arrays.items():
+        data_vars[var] = xr.DataArray(var_array, dims=_field_dims(var_array.ndim))
     
     ds = xr.Dataset(
         data_vars, 
@@ -95,9 +179,13 @@ def parse_openfoam_case(case_dir:str, variables:list[str], time_dirs:list[str]|s
 
 
 
-def read_uq_experiment(case_dir:str, variables:list[str], n_samples:int, time_dirs:list[str]|str=None, nthreads:int=1):
+def read_uq_experiment(case_dir:str, variables:list[str], n_samples:int, time_dirs:list[str]|str=None, nthreads:int=1, dtype=np.float64):
     """
     Parses the OpenFOAM case directory structure and reads all field data.
+
+    All samples are assumed to share the mesh of sample_000, which is read once and
+    used as the x/y/z coordinates of every sample. Studies with a templated mesh
+    (e.g. geometric uncertainty) should read each sample with parse_openfoam_case.
     
     Parameters:
         case_dir (str): Path to the root directory of the OpenFOAM case.
@@ -105,40 +193,92 @@ def read_uq_experiment(case_dir:str, variables:list[str], n_samples:int, time_di
         n_samples (int): Number of samples to read.
         time_dirs (list or str, optional): List of time directories to read.
         nthreads (int): Number of parallel jobs.
+        dtype (np.dtype, optional): Floating point type of the field data (default: np.float64).
         
     Returns:
         xr.Dataset: Dataset with sample, time, and cell dimensions.
+            Samples with different time directories are aligned on the union of
+            their times, NaN-padded where a sample has no data.
     """
 
     case_dir = Path(case_dir)
 
-    datasets = []
-    sample_ids = []
+    # All samples share the template mesh: read it once here, workers only need its size
+    x, y, z = _cached_readmesh(str(case_dir / "sample_000"))
+
+    # Workers return plain arrays which are written straight into
+    # (sample, time, cell, ...) arrays allocated once from the first case
+    sample_arrays = {}
     
     with mp.get_context('spawn').Pool(nthreads) as pool:
-        results = list(tqdm(
+        results = tqdm(
             pool.imap(
                 partial(
-                    parse_openfoam_case,
+                    _read_case_arrays,
+                    n_cells=len(x),
                     variables=variables,
-                    time_dirs=time_dirs
+                    time_dirs=time_dirs,
+                    dtype=dtype
                 ),
                 [str(case_dir / f"sample_{i:03d}") for i in range(n_samples)],
+                chunksize=max(1, n_samples // (nthreads * 4))
             ),
             total=n_samples,
             desc="Processing cases",
             unit="case",
             mininterval=1.0
-        ))
-    
-    # Collect datasets with sample indices
-    for i, ds in enumerate(results):
-        datasets.append(ds)
-        sample_ids.append(i)
-    
-    # Concatenate along sample dimension
-    combined_ds = xr.concat(datasets, dim='sample')
-    combined_ds = combined_ds.assign_coords(sample=sample_ids)
+        )
+        ragged = None   # per-sample (times, arrays), once the samples' time layouts differ
+        for i, (times, arrays) in enumerate(results):
+            if i == 0:
+                first_times = times
+                for var, var_array in arrays.items():
+                    sample_arrays[var] = np.empty((n_samples,) + var_array.shape, dtype=var_array.dtype)
+
+            if ragged is None and times != first_times:
+                # Samples with different time directories (e.g. diverged or adaptive
+                # time step runs) are aligned on the union of their times below
+                ragged = [
+                    (first_times, {var: var_array[j] for var, var_array in sample_arrays.items()})
+                    for j in range(i)
+                ]
+            if ragged is not None:
+                ragged.append((times, arrays))
+                continue
+
+            for var, var_array in arrays.items():
+                sample_arrays[var][i] = var_array
+
+    mesh_coords = {
+        'x': ('cell', x),
+        'y': ('cell', y),
+        'z': ('cell', z)
+    }
+
+    if ragged is not None:
+        # NaN-padded at the times a sample does not have
+        datasets = [
+            xr.Dataset(
+                {var: xr.DataArray(var_array, dims=_field_dims(var_array.ndim)) for var, var_array in arrays.items()},
+                coords={'time': times}
+            )
+            for times, arrays in ragged
+        ]
+        combined_ds = xr.concat(datasets, dim='sample', join='outer')
+        return combined_ds.assign_coords(sample=list(range(n_samples)), **mesh_coords)
+
+    data_vars = {}
+    for var, var_array in sample_arrays.items():
+        data_vars[var] = xr.DataArray(var_array, dims=['sample'] + _field_dims(var_array.ndim - 1))
+
+    combined_ds = xr.Dataset(
+        data_vars,
+        coords={
+            'sample': list(range(n_samples)),
+            'time': first_times,
+            **mesh_coords
+        }
+    )
     
     return combined_ds
 
@@ -173,16 +313,21 @@ def load_config(config_path:str="config.yaml"):
 # Not imported to the main module ===
 # ===================================
 
-import re
-import json
+_INTERNAL_FIELD = b'internalField'
+_PAREN_TABLE = bytes.maketrans(b'()', b'  ')
+_NUM_RE = re.compile(rb"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_FORMAT_RE = re.compile(rb"format\s+(ascii|binary)\s*;")
+_SCALAR_BITS_RE = re.compile(rb"scalar=(32|64)")
+_LIST_NCOMP = {b'scalar': 1, b'vector': 3, b'symmTensor': 6, b'tensor': 9}
 
-def read_openfoam_field(file_path):
+def read_openfoam_field(file_path, dtype=np.float64):
     """
     LEGACY
     Reads an OpenFOAM field file and returns the data as a NumPy array.
 
     Parameters:
         file_path (str): Path to the OpenFOAM field file.
+        dtype (np.dtype, optional): Floating point type of the returned array (default: np.float64).
 
     Returns:
         np.ndarray: NumPy array with the field data.
@@ -191,43 +336,66 @@ def read_openfoam_field(file_path):
     print("Warning: Legacy function. Use fluidfoam.readfield instead!")
 
     try:
-        with open(file_path, 'r') as f:
-            content = f.readlines()
-        
-        # Find the 'internalField' line
-        start_index = next(i for i, line in enumerate(content) if line.startswith('internalField'))
-
-        # Check if the field is uniform
-        field_info = content[start_index]
-        if field_info.split()[1] == 'uniform':
-
-            data = re.findall(r"[-+]?\d*\.\d+|\d+", field_info)
-            values = np.array([float(d) for d in data])
-            return values
-            
-        # Non uniform has the number of elements in the data block
-        num_elements = int(content[start_index + 1])
-        
-        # Extract the data block
-        data = content[start_index + 3:start_index + 3 + num_elements]
-        
-        # Parse data into NumPy array
-        values = []
-        for line in data:
-            line = line.strip().strip('()')
-            if ' ' in line:  # Vector or multiple values
-                try:
-                    values.append(np.array([float(x) for x in line.split()]))
-                except ValueError:
-                    print(f"Warning: Skipping malformed vector line: {line}")
-            else:  # Single value
-                try:
-                    values.append(float(line))
-                except ValueError:
-                    print(f"Warning: Skipping malformed scalar line: {line}")
-
-        return np.array(values)
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Jump straight to the 'internalField' entry, skipping the header
+            # (the entry must start a line, as in a 'line.startswith' scan)
+            if mm[:len(_INTERNAL_FIELD)] == _INTERNAL_FIELD:
+                start = 0
+            else:
+                start = mm.find(b'\n' + _INTERNAL_FIELD) + 1
+                if start == 0:
+                    raise ValueError("'internalField' entry not found")
+
+            # Check if the field is uniform
+            end = mm.find(b'\n', start)
+            field_info = mm[start:end if end != -1 else len(mm)]    # last line may lack a newline
+            if field_info.split()[1] == b'uniform':
+
+                data = _NUM_RE.findall(field_info)
+                values = np.array(data, dtype=dtype)
+                return values
+
+            # Non uniform has the number of elements right before the data block
+            data_start = mm.find(b'(', start)
+            list_info = mm[start:data_start].split()
+            num_elements = int(list_info[-1])
+
+            # Output shape is known up front from the List<type> declaration
+            list_type = list_info[-2].partition(b'<')[2].rstrip(b'>')
+            ncomp = _LIST_NCOMP.get(list_type, -1)
+            if num_elements == 0:   # e.g. 'nonuniform List<scalar> 0();'
+                return np.empty((0,) if ncomp in (1, -1) else (0, ncomp), dtype=dtype)
+
+            header = mm[:start]
+            fmt = _FORMAT_RE.search(header)
+            if fmt is not None and fmt.group(1) == b'binary':
+                # Binary data is a contiguous block of doubles right after the '('
+                if ncomp == -1:
+                    raise ValueError(f"Unsupported binary list type: {list_type.decode()}")
+                bits = _SCALAR_BITS_RE.search(header)
+                file_dtype = '<f4' if bits is not None and bits.group(1) == b'32' else '<f8'
+
+                f.seek(data_start + 1)
+                values = np.fromfile(f, dtype=file_dtype, count=num_elements * ncomp).astype(dtype, copy=False)
+            else:
+                # Extract the data block (up to the ';' closing the entry)
+                data_end = mm.find(b';', data_start)
+                block = mm[data_start + 1:data_end]
+
+                # Strip the vector parentheses and parse the whole block at once
+                values = np.fromstring(block.translate(_PAREN_TABLE), dtype=dtype, sep=' ')
+
+                # np.fromstring stops at the first token it cannot parse
+                if ncomp != -1 and values.size != num_elements * ncomp:
+                    raise ValueError(f"Malformed data block: expected {num_elements * ncomp} values, parsed {values.size}")
+
+        # (N,) for scalar fields, (N, ncomp) for vector/tensor fields
+        values = values.reshape(num_elements, ncomp)
+        if values.shape[1] == 1:
+            values = values[:, 0]
+
+        return values
 
     except Exception as e:
         print(f"Error reading file {file_path}: {e}")
-        return None
\ No newline at end of file
+        return None